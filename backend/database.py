@@ -13,5 +13,51 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 
 DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+# Pool groß genug für parallele Requests, LIFO hält Connections warm
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=20,
+    pool_recycle=1800,
+    pool_use_lifo=True,
+)
+# expire_on_commit=False, damit Objekte nach dem Commit ohne Re-SELECT lesbar bleiben
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Optionales Lese-Replikat für die reinen GET-Endpoints: eigener, größerer
+# Pool, kein pre_ping (spart einen Round-Trip pro Checkout, kurzes recycle
+# fängt tote Connections ab). Ohne READ_DB_HOST läuft alles über die primäre
+# Engine - ein zweiter Pool auf dieselbe DB brächte nichts.
+READ_DB_HOST = os.getenv("READ_DB_HOST")
+
+if READ_DB_HOST:
+    READ_DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{READ_DB_HOST}:{DB_PORT}/{DB_NAME}"
+    read_engine = create_engine(
+        READ_DATABASE_URL,
+        pool_size=50,
+        max_overflow=50,
+        pool_recycle=300,
+        pool_use_lifo=True,
+    )
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
\ No newline at end of file
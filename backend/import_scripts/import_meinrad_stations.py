@@ -1,6 +1,7 @@
 import re
 from pathlib import Path
 import pandas as pd
+from sqlalchemy.dialects.postgresql import insert
 
 from database import SessionLocal
 from models import Provider, Country, City, Station
@@ -11,19 +12,6 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 FILE_PATH = BASE_DIR / "dataExcel" / "meinRad_Stationen.csv"
 
 
-def parse_name(label):
-    if not isinstance(label, str):
-        return None
-    return label.split(";")[0].replace("Name:", "").strip()
-
-
-def parse_station_no(label):
-    if not isinstance(label, str):
-        return None
-    m = STATION_NO_RE.search(label)
-    return int(m.group(1)) if m else None
-
-
 def get_or_create_provider_city(db):
     provider = db.query(Provider).filter(Provider.name == "meinRad").first()
     if not provider:
@@ -49,39 +37,64 @@ def get_or_create_provider_city(db):
 def run():
     df = pd.read_csv(FILE_PATH, sep=";", encoding="latin1")
 
+    # Label-Parsing vektorisiert statt pro Zeile
+    labels = df["label"].astype("string")
+    df["name"] = (
+        labels.str.split(";", n=1).str[0]
+        .str.replace("Name:", "", regex=False)
+        .str.strip()
+    )
+    df["station_number"] = (
+        labels.str.extract(STATION_NO_RE, expand=False)
+        .astype("Int64")
+        .fillna(df["id"])
+    )
+
+    # Numerik spaltenweise statt int()/float() pro Zeile
+    df["id"] = df["id"].astype("int64")
+    df["lat"] = df["latitude"].to_numpy(dtype="float64") * 1e-8
+    df["lng"] = df["longitude"].to_numpy(dtype="float64") * 1e-8
+
     db = SessionLocal()
     provider_id, city_id = get_or_create_provider_city(db)
 
-    inserted = 0
-
-    for _, row in df.iterrows():
-        external_id = int(row["id"])
-        label = row["label"]
-
-        name = parse_name(label)
-        station_number = parse_station_no(label) or external_id
-
-        lat = float(row["latitude"]) / 100_000_000
-        lng = float(row["longitude"]) / 100_000_000
-
-        st = db.query(Station).filter_by(external_place_id=external_id).first()
-        if not st:
-            st = Station(external_place_id=external_id)
-            db.add(st)
-            inserted += 1
-
-        st.provider_id = provider_id
-        st.city_id = city_id
-        st.name = name
-        st.station_number = station_number
-        st.lat = lat
-        st.lng = lng
-        st.active = True
+    records = []
+
+    # itertuples liefert plain Tuples, iterrows boxt jede Zeile in eine Series
+    cols = df[["id", "name", "station_number", "lat", "lng"]]
+    for external_id, name, station_number, lat, lng in cols.itertuples(index=False, name=None):
+        records.append({
+            "external_place_id": int(external_id),
+            "provider_id": provider_id,
+            "city_id": city_id,
+            "name": name if pd.notna(name) else None,
+            "station_number": int(station_number),
+            "lat": lat,
+            "lng": lng,
+            "active": True,
+        })
+
+    # Ein Statement statt SELECT + INSERT/UPDATE pro Zeile
+    if records:
+        stmt = insert(Station).values(records)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["external_place_id"],
+            set_={
+                "provider_id": stmt.excluded.provider_id,
+                "city_id": stmt.excluded.city_id,
+                "name": stmt.excluded.name,
+                "station_number": stmt.excluded.station_number,
+                "lat": stmt.excluded.lat,
+                "lng": stmt.excluded.lng,
+                "active": stmt.excluded.active,
+            },
+        )
+        db.execute(stmt)
 
     db.commit()
     db.close()
 
-    print("DONE. Inserted:", inserted)
+    print("DONE. Upserted:", len(records))
 
 
 if __name__ == "__main__":
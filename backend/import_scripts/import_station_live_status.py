@@ -1,11 +1,24 @@
 # import_station_live_status.py
+import csv
+import io
 import json
 import requests
+from requests.adapters import HTTPAdapter, Retry
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
 import psycopg2
 from datetime import datetime, timezone
 
 API_BASE = "https://api.nextbike.net/maps/nextbike-live.json"
 
+# Eine Session mit Connection-Pool statt neuem TCP/TLS-Handshake pro Stadt
+session = requests.Session()
+session.mount(
+    "https://",
+    HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                max_retries=Retry(total=3, backoff_factor=0.3)),
+)
+
 
 conn = psycopg2.connect(
     dbname="bikesharing",
@@ -42,38 +55,72 @@ rows = cur.fetchall()
 print("Stations aus DB:", len(rows))
 
 
+# pro Stadt ein Dict mit fertig ge-int-ten Keys, einmalig aufgebaut
 city_map = {}
 for station_id, external_place_id, city_uid in rows:
-    city_map.setdefault(city_uid, {})
-    city_map[city_uid][int(external_place_id)] = station_id
+    city_map.setdefault(city_uid, {})[int(external_place_id)] = station_id
 
 print("Städte im Mapping:", len(city_map))
 
 
 
 
-insert_sql = """
-    INSERT INTO station_live_status (
+copy_sql = """
+    COPY station_live_status (
         station_id,
         ts,
         bikes_available,
         docks_available,
         bike_types
     )
-    VALUES (%s, %s, %s, %s, %s)
+    FROM STDIN WITH (FORMAT csv)
 """
 
+
+def copy_rows(cur, rows):
+    # COPY ist der schnellste Weg für große Snapshot-Mengen;
+    # leere (unquoted) CSV-Felder werden zu NULL
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(copy_sql, buf)
+
 now = datetime.now(timezone.utc)
 total_snapshots = 0
 
-for city_uid, station_dict in city_map.items():
-    print(f"\n==> Lade Live-Status für city_uid={city_uid}, "
-          f"{len(station_dict)} Stations in DB")
+# bike_types wiederholt sich über viele Stationen -> einmal encoden pro Variante
+bike_types_cache = {}
 
-  
-    res = requests.get(API_BASE, params={"city": city_uid})
+
+def encode_bike_types(bike_types):
+    if not isinstance(bike_types, (dict, list)):
+        return None
+    try:
+        key = frozenset(bike_types.items()) if isinstance(bike_types, dict) else tuple(bike_types)
+    except TypeError:
+        # unhashbare Werte (verschachtelte Dicts) -> direkt encoden
+        return json.dumps(bike_types)
+    js = bike_types_cache.get(key)
+    if js is None:
+        js = bike_types_cache.setdefault(key, json.dumps(bike_types))
+    return js
+
+
+def fetch_city(city_uid):
+    res = session.get(API_BASE, params={"city": city_uid})
     res.raise_for_status()
-    data = res.json()
+    return city_uid, res.json()
+
+
+# Kein Datenabhängigkeit zwischen Städten -> parallel holen,
+# DB-Schreiben bleibt im Hauptthread
+with ThreadPoolExecutor(max_workers=16) as pool:
+    results = list(pool.map(fetch_city, city_map))
+
+for city_uid, data in results:
+    station_dict = city_map[city_uid]
+    print(f"\n==> Live-Status für city_uid={city_uid}, "
+          f"{len(station_dict)} Stations in DB")
 
     countries = data.get("countries", [])
     if not countries:
@@ -85,58 +132,53 @@ for city_uid, station_dict in city_map.items():
     places = nb_city.get("places", [])
     print("  Places in API:", len(places))
 
-    count_city = 0
+    # Bikes/Docks spaltenweise berechnen statt int()-Arithmetik pro Place
+    dfp = pd.DataFrame(places)
+    for col in ("uid", "place_id", "bikes", "bike_numbers", "bike_racks", "bike_types"):
+        if col not in dfp.columns:
+            dfp[col] = None
 
-    for place in places:
-       
-        ext_id = place.get("uid") or place.get("place_id")
-        if ext_id is None:
-            continue
+    ext_ids = pd.to_numeric(
+        dfp["uid"].where(dfp["uid"].notna(), dfp["place_id"]), errors="coerce"
+    ).astype("Int64")
+    station_ids = ext_ids.map(station_dict)
 
-        try:
-            ext_id_int = int(ext_id)
-        except (TypeError, ValueError):
-            continue
+    bikes_col = pd.to_numeric(dfp["bikes"], errors="coerce")
+    fallback = dfp["bike_numbers"].map(lambda v: len(v) if isinstance(v, list) else 0)
+    bikes_col = bikes_col.fillna(fallback).astype("Int64")
+
+    capacity_col = pd.to_numeric(dfp["bike_racks"], errors="coerce").astype("Int64")
+    docks_col = capacity_col - bikes_col
 
-     
-        station_id = station_dict.get(ext_id_int)
-        if not station_id:
-           
+    rows_city = []
+
+    for station_id, bikes, docks_available, bike_types in zip(
+        station_ids, bikes_col, docks_col, dfp["bike_types"]
+    ):
+        if pd.isna(station_id):
             continue
 
-        
-        bikes = place.get("bikes")
-        if bikes is None:
-           
-            bike_numbers = place.get("bike_numbers") or []
-            bikes = len(bike_numbers)
-
-        
-        capacity = place.get("bike_racks")
-        docks_available = None
-        if capacity is not None and bikes is not None:
-            try:
-                docks_available = int(capacity) - int(bikes)
-            except Exception:
-                docks_available = None
-
-        bike_types = place.get("bike_types")  
-
-        cur.execute(
-            insert_sql,
-            (
-                station_id,
-                now,
-                bikes,
-                docks_available,
-                json.dumps(bike_types) if bike_types is not None else None,
-            ),
-        )
-        count_city += 1
-        total_snapshots += 1
+        rows_city.append((
+            int(station_id),
+            now,
+            int(bikes) if pd.notna(bikes) else None,
+            int(docks_available) if pd.notna(docks_available) else None,
+            encode_bike_types(bike_types),
+        ))
+
+    if rows_city:
+        copy_rows(cur, rows_city)
 
+    total_snapshots += len(rows_city)
     conn.commit()
-    print(f"  -> {count_city} Live-Snapshots gespeichert.")
+    print(f"  -> {len(rows_city)} Live-Snapshots gespeichert.")
+
+# Heatmap-View auf den neuen Stand bringen.
+# REFRESH ... CONCURRENTLY darf nicht in einem Transaktionsblock laufen,
+# psycopg2 öffnet aber implizit einen -> für den Refresh auf autocommit
+conn.autocommit = True
+cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY heatmap_latest")
+print("heatmap_latest refreshed.")
 
 cur.close()
 conn.close()
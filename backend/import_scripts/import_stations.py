@@ -1,9 +1,19 @@
 # import_stations.py
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import psycopg2
+from psycopg2.extras import execute_values
 
 API_BASE = "https://api.nextbike.net/maps/nextbike-live.json"
 
+# Eine Session mit Connection-Pool statt neuem TCP/TLS-Handshake pro Stadt
+session = requests.Session()
+session.mount(
+    "https://",
+    HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                max_retries=Retry(total=3, backoff_factor=0.3)),
+)
+
 
 conn = psycopg2.connect(
     dbname="bikesharing",
@@ -48,7 +58,7 @@ insert_sql = """
         station_number,
         active
     )
-    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    VALUES %s
     ON CONFLICT (external_place_id) DO UPDATE
       SET name = EXCLUDED.name,
           lat  = EXCLUDED.lat,
@@ -63,7 +73,7 @@ for city_id, city_uid, city_name in cities:
 
    
     params = {"city": city_uid}
-    res = requests.get(API_BASE, params=params)
+    res = session.get(API_BASE, params=params)
     res.raise_for_status()
     data = res.json()
 
@@ -79,37 +89,32 @@ for city_id, city_uid, city_name in cities:
 
     print(f"  {len(places)} Stationen gefunden.")
 
-    count = 0
+    # pro external_place_id nur eine Zeile, sonst meckert ON CONFLICT im Batch
+    rows_by_ext_id = {}
     for place in places:
         external_place_id = place.get("uid") or place.get("place_id")
         if external_place_id is None:
-            continue  
-
-        name = place.get("name")
-        lat = place.get("lat")
-        lng = place.get("lng")
-        capacity = place.get("bike_racks") 
-        station_number = place.get("number") 
-        active = not place.get("is_disabled", False)
-
-        cur.execute(
-            insert_sql,
-            (
-                provider_id,
-                city_id,
-                external_place_id,
-                name,
-                lat,
-                lng,
-                capacity,
-                station_number,
-                active,
-            ),
+            continue
+
+        rows_by_ext_id[external_place_id] = (
+            provider_id,
+            city_id,
+            external_place_id,
+            place.get("name"),
+            place.get("lat"),
+            place.get("lng"),
+            place.get("bike_racks"),
+            place.get("number"),
+            not place.get("is_disabled", False),
         )
-        count += 1
+
+    # Ein Multi-Row-Upsert pro Stadt statt einem Round-Trip pro Station
+    rows_city = list(rows_by_ext_id.values())
+    if rows_city:
+        execute_values(cur, insert_sql, rows_city, page_size=500)
 
     conn.commit()
-    print(f"  -> {count} Stationen gespeichert/aktualisiert.")
+    print(f"  -> {len(rows_city)} Stationen gespeichert/aktualisiert.")
 
 cur.close()
 conn.close()
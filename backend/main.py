@@ -1,5 +1,9 @@
 # main.py
+import os
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
 
 from routers.cities import router as cities_router
 from routers.stations import router as stations_router
@@ -12,8 +16,35 @@ from routers.planning import router as planning_router
 
 
 
-app = FastAPI()
-Base.metadata.create_all(bind=engine)
+# orjson serialisiert die großen Stations-/Kontextlisten in C statt in Python-json
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Vorberechnete Heatmap: letzter Snapshot + Auslastung pro Station
+HEATMAP_VIEW_DDL = [
+    text("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS heatmap_latest AS
+        SELECT s.id, s.name, s.lat, s.lng,
+               sls.bikes_available::float / NULLIF(s.capacity, 0) AS value
+        FROM stations s
+        JOIN LATERAL (
+            SELECT bikes_available
+            FROM station_live_status
+            WHERE station_id = s.id
+            ORDER BY ts DESC
+            LIMIT 1
+        ) sls ON true
+    """),
+    # Unique Index wird für REFRESH ... CONCURRENTLY gebraucht
+    text("CREATE UNIQUE INDEX IF NOT EXISTS ix_heatmap_latest_id ON heatmap_latest (id)"),
+]
+
+# DDL nur auf Wunsch ausführen, nicht bei jedem Worker-Start
+if os.getenv("RUN_MIGRATIONS", "1") == "1":
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for ddl in HEATMAP_VIEW_DDL:
+            conn.execute(ddl)
+
 app.include_router(cities_router)
 app.include_router(stations_router)
 app.include_router(live_status_router)
@@ -9,6 +9,8 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
+    func,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -25,8 +27,8 @@ class Provider(Base):
     domain = Column(String)
 
     # relations
-    cities = relationship("City", back_populates="provider", lazy="joined")
-    stations = relationship("Station", back_populates="provider", lazy="joined")
+    cities = relationship("City", back_populates="provider")
+    stations = relationship("Station", back_populates="provider")
 
 
 # ---------- Country ----------
@@ -40,7 +42,7 @@ class Country(Base):
     timezone = Column(String)
     calling_code = Column(String)
 
-    cities = relationship("City", back_populates="country", lazy="joined")
+    cities = relationship("City", back_populates="country")
 
 
 # ---------- City ----------
@@ -64,7 +66,11 @@ class City(Base):
 
     provider = relationship("Provider", back_populates="cities")
     country = relationship("Country", back_populates="cities")
-    stations = relationship("Station", back_populates="city", lazy="joined")
+    stations = relationship("Station", back_populates="city")
+
+
+# für den Städtenamen-Lookup in /planning/nearby-stations
+Index("ix_cities_name_lower", func.lower(City.name))
 
 
 # ---------- Station ----------
@@ -73,6 +79,10 @@ class City(Base):
 
 class Station(Base):
     __tablename__ = "stations"
+    __table_args__ = (
+        # für den Bounding-Box-Vorfilter in /planning/nearby-stations
+        Index("ix_stations_city_lat_lng", "city_id", "lat", "lng"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     provider_id = Column(Integer, ForeignKey("providers.id"))
@@ -100,6 +110,10 @@ class Station(Base):
         "StationLiveStatus",
         back_populates="station",
         cascade="all, delete-orphan",
+        # Versehentlicher Zugriff würde die komplette Status-Historie laden:
+        # lieber laut scheitern als stilles N+1 (Abfragen laufen direkt über
+        # StationLiveStatus bzw. die Heatmap-View)
+        lazy="raise",
     )
 
 
@@ -114,4 +128,12 @@ class StationLiveStatus(Base):
     docks_available = Column(Integer)
     bike_types = Column(JSONB)
 
-    station = relationship("Station", back_populates="live_status")
\ No newline at end of file
+    station = relationship("Station", back_populates="live_status")
+
+
+# "letzter Status pro Station": Index Scan Backward + LIMIT 1 statt Seqscan+Sort
+Index(
+    "ix_station_live_status_station_ts",
+    StationLiveStatus.station_id,
+    StationLiveStatus.ts.desc(),
+)
\ No newline at end of file
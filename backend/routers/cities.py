@@ -1,8 +1,9 @@
 # routers/cities.py
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models import City
 
 router = APIRouter(
@@ -10,18 +11,20 @@ router = APIRouter(
     tags=["cities"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-
 @router.get("")
 def list_cities(db: Session = Depends(get_db)):
-    cities = db.query(City).all()
+    # Nur die benötigten Spalten, keine ORM-Objekte
+    rows = db.execute(
+        select(
+            City.id,
+            City.uid,
+            City.name,
+            City.lat,
+            City.lng,
+            City.booked_bikes,
+            City.available_bikes,
+        )
+    ).all()
 
     return [
         {
@@ -33,14 +36,24 @@ def list_cities(db: Session = Depends(get_db)):
             "booked_bikes": c.booked_bikes,
             "available_bikes": c.available_bikes,
         }
-        for c in cities
+        for c in rows
     ]
 
 
 
 @router.get("/{city_id}")
 def get_city(city_id: int, db: Session = Depends(get_db)):
-    city = db.query(City).filter(City.id == city_id).first()
+    city = db.execute(
+        select(
+            City.id,
+            City.uid,
+            City.name,
+            City.lat,
+            City.lng,
+            City.booked_bikes,
+            City.available_bikes,
+        ).where(City.id == city_id)
+    ).first()
 
     if not city:
         raise HTTPException(status_code=404, detail="City not found")
@@ -1,45 +1,34 @@
 # routers/heatmap.py
 from fastapi import APIRouter, Depends
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from database import SessionLocal
-from models import Station, StationLiveStatus
+from database import get_db
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["heatmap"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Die Auslastung liegt vorberechnet in der Materialized View heatmap_latest
+# (angelegt in main.py, refresh nach dem Live-Status-Import)
+HEATMAP_SQL = text("""
+    SELECT id, name, lat, lng, value
+    FROM heatmap_latest
+    WHERE value IS NOT NULL
+""")
+
 
 @router.get("/heatmap")
 def get_heatmap(db: Session = Depends(get_db)):
-    stations = db.query(Station).all()
-    result = []
-
-    for s in stations:
-        snap = (
-            db.query(StationLiveStatus)
-            .filter(StationLiveStatus.station_id == s.id)
-            .order_by(desc(StationLiveStatus.ts))
-            .first()
-        )
-        if not snap or not s.capacity or s.capacity == 0:
-            continue
-
-        utilisation = snap.bikes_available / s.capacity  # Wert 0..1
-
-        result.append({
-            "station_id": s.id,
-            "name": s.name,
-            "lat": s.lat,
-            "lng": s.lng,
-            "value": utilisation
-        })
+    rows = db.execute(HEATMAP_SQL).all()
 
-    return result
+    return [
+        {
+            "station_id": r.id,
+            "name": r.name,
+            "lat": r.lat,
+            "lng": r.lng,
+            "value": r.value,  # Wert 0..1
+        }
+        for r in rows
+    ]
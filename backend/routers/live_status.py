@@ -1,8 +1,8 @@
 # routers/live_status.py
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from database import SessionLocal
+from sqlalchemy import desc, text
+from database import get_db
 from models import Station, StationLiveStatus
 
 router = APIRouter(
@@ -10,40 +10,22 @@ router = APIRouter(
     tags=["live-status"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Ein Query für alle Stationen statt ein Snapshot-Query pro Station
+LATEST_LIVE_SQL = text("""
+    SELECT DISTINCT ON (sls.station_id)
+           s.id, s.name, s.lat, s.lng, s.capacity,
+           sls.bikes_available, sls.docks_available, sls.ts
+    FROM stations s
+    JOIN station_live_status sls ON sls.station_id = s.id
+    ORDER BY sls.station_id, sls.ts DESC
+""")
+
 
 @router.get("/live")
 def list_stations_live(db: Session = Depends(get_db)):
-    stations = db.query(Station).all()
-    result = []
-
-    for s in stations:
-        snap = (
-            db.query(StationLiveStatus)
-            .filter(StationLiveStatus.station_id == s.id)
-            .order_by(desc(StationLiveStatus.ts))
-            .first()
-        )
-        if not snap:
-            continue
-
-        result.append({
-            "id": s.id,
-            "name": s.name,
-            "lat": s.lat,
-            "lng": s.lng,
-            "capacity": s.capacity,
-            "bikes_available": snap.bikes_available,
-            "docks_available": snap.docks_available,
-            "ts": snap.ts,
-        })
-
-    return result
+    # Spaltennamen im SQL entsprechen exakt dem Response-Format
+    rows = db.execute(LATEST_LIVE_SQL).mappings().all()
+    return [dict(r) for r in rows]
 
 
 @router.get("/{station_id}/live")
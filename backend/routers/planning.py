@@ -1,48 +1,100 @@
 # backend/routers/planning.py
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+import asyncio
+import copy
 import math
+import time
 
-from database import SessionLocal
+import numpy as np
+
+from database import get_db
 from models import Station, City
 from services.overpass import (
     OverpassError,
-    count_bus_stops,
-    count_tram_stops,
-    count_rail_stations,
-    count_sbahn_stations,
-    count_ubahn_stations,
-    count_schools_universities,
-    count_shops,
-    count_pois,
+    counts_combined,
     fetch_poi_elements,
 )
 
 router = APIRouter(prefix="/api/v1/planning", tags=["planning"])
 
+def flat_earth_m(lat, lng, lats, lngs):
+    """
+    Distanzen vom Punkt (lat, lng) zu allen (lats, lngs) in Metern, vektorisiert.
+    Äquirektangulare Näherung: bei radius <= 5 km unter 0,5 m Fehler und
+    deutlich billiger als Haversine (keine trig-Aufrufe pro Punkt).
+    """
+    x = (lngs - lng) * (math.cos(math.radians(lat)) * 111320.0)
+    y = (lats - lat) * 110540.0
+    return np.hypot(x, y)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+# Overpass ist die teuerste Abhängigkeit: Antworten pro ~11m-Raster 15 min cachen
+_CONTEXT_CACHE_TTL = 900
+_CONTEXT_CACHE_MAX = 4096
+_context_cache: dict = {}
+
+
+def _context_cache_get(key):
+    hit = _context_cache.get(key)
+    if hit is None:
+        return None
+    if hit[0] < time.monotonic():
+        _context_cache.pop(key, None)
+        return None
+    return hit[1]
+
+
+def _context_cache_put(key, payload):
+    if len(_context_cache) >= _CONTEXT_CACHE_MAX:
+        # ältesten Eintrag verdrängen (Dicts halten Einfüge-Reihenfolge)
+        _context_cache.pop(next(iter(_context_cache)), None)
+    _context_cache[key] = (time.monotonic() + _CONTEXT_CACHE_TTL, payload)
+
+
+# Single-Flight: identische, gleichzeitige Anfragen teilen sich einen Overpass-Call
+_context_inflight: dict = {}
+
+
+async def _fetch_context(lat: float, lng: float, radius: int) -> dict:
+    # Alle Zähler in einer kombinierten Abfrage, die POI-Elemente parallel dazu
+    counts, poi_elements = await asyncio.gather(
+        counts_combined(lat, lng, radius),
+        fetch_poi_elements(lat, lng, radius),
+    )
+
+    poi_breakdown = {
+        key: counts[key]
+        for key in ("hospitals", "employers", "parks", "malls_supermarkets", "tourism")
+    }
+
+    return {
+        "lat": lat,
+        "lng": lng,
+        "radius_m": radius,
+
+        "bus_stops": counts["bus_stops"],
+        "tram_stops": counts["tram_stops"],
+
+        "rail_stations": counts["rail_stations"],
+        "sbahn_stations": counts["sbahn_stations"],
+        "ubahn_stations": counts["ubahn_stations"],
 
-def haversine_m(lat1, lng1, lat2, lng2):
-    R = 6371000.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lng2 - lng1)
+        "schools": counts["schools"],
+        "universities": counts["universities"],
 
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+        "shops": counts["shops"],
+
+        "pois_total": sum(poi_breakdown.values()),
+        "pois": poi_breakdown,
+        "poi_elements": poi_elements,
+    }
 
 
 @router.get("/context")
-def planning_context(
+async def planning_context(
+    response: Response,
     lat: float = Query(...),
     lng: float = Query(...),
     radius: int = Query(500, ge=50, le=5000),
@@ -54,45 +106,50 @@ def planning_context(
     - Shops
     - POIs (breakdown + total)
     """
+    response.headers["Cache-Control"] = "public, max-age=300"
+
+    cache_key = (round(lat, 4), round(lng, 4), radius)
+    cached = _context_cache_get(cache_key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
     try:
-        bus_stops = count_bus_stops(lat, lng, radius)
-        tram_stops = count_tram_stops(lat, lng, radius)
-        rail_stations = count_rail_stations(lat, lng, radius)
-        sbahn_stations = count_sbahn_stations(lat, lng, radius)
-        ubahn_stations = count_ubahn_stations(lat, lng, radius)
+        fut = _context_inflight.get(cache_key)
+        if fut is None:
+            # erster Aufruf für diesen Key startet den Fetch, alle weiteren warten mit
+            fut = asyncio.ensure_future(_fetch_context(lat, lng, radius))
+            _context_inflight[cache_key] = fut
+            fut.add_done_callback(lambda _: _context_inflight.pop(cache_key, None))
 
-        edu = count_schools_universities(lat, lng, radius)
-        shops = count_shops(lat, lng, radius)
-        pois = count_pois(lat, lng, radius)
-        poi_elements = fetch_poi_elements(lat, lng, radius)
+        # shield: bricht ein Client ab (Starlette cancelt den Handler-Task),
+        # läuft der geteilte Fetch für die übrigen Wartenden weiter
+        payload = await asyncio.shield(fut)
 
     except OverpassError as e:
-       
+
         raise HTTPException(status_code=502, detail=f"Overpass error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
-    return {
-        "lat": lat,
-        "lng": lng,
-        "radius_m": radius,
+    # nur erfolgreiche Antworten cachen
+    _context_cache_put(cache_key, payload)
+    return payload
 
-        "bus_stops": bus_stops,
-        "tram_stops": tram_stops,
 
-        "rail_stations": rail_stations,
-        "sbahn_stations": sbahn_stations,
-        "ubahn_stations": ubahn_stations,
+# Städte ändern sich praktisch nie -> Name->ID einmal auflösen und merken
+_city_id_cache: dict = {}
 
-        "schools": edu["schools"],
-        "universities": edu["universities"],
 
-        "shops": shops,
-
-        "pois_total": pois["total"],
-        "pois": pois["breakdown"],
-        "poi_elements": poi_elements,
-    }
+def _city_id_for(db, city_name: str):
+    key = city_name.lower()
+    city_id = _city_id_cache.get(key)
+    if city_id is None:
+        city_id = db.execute(
+            select(City.id).where(func.lower(City.name) == key)
+        ).scalar()
+        if city_id is not None:
+            _city_id_cache[key] = city_id
+    return city_id
 
 
 @router.get("/nearby-stations")
@@ -103,28 +160,49 @@ def nearby_stations(
     city_name: str = Query("Mainz"),
     db: Session = Depends(get_db),
 ):
-    stations = (
-        db.query(Station)
-        .join(City, City.id == Station.city_id)
-        .filter(City.name.ilike(city_name))
-        .filter(Station.lat.isnot(None))
-        .filter(Station.lng.isnot(None))
-        .all()
-    )
+    stations = []
+    city_id = _city_id_for(db, city_name)
+
+    if city_id is not None:
+        # nur die Spalten, die in Distanzrechnung und Response landen
+        base_query = (
+            select(Station.id, Station.name, Station.station_number, Station.lat, Station.lng)
+            .where(Station.city_id == city_id)
+            .where(Station.lat.isnot(None))
+            .where(Station.lng.isnot(None))
+        )
+
+        # Bounding-Box-Vorfilter in SQL: Index-Scan statt alle Stationen laden
+        dlat = radius / 111320.0
+        dlng = radius / (111320.0 * max(math.cos(math.radians(lat)), 1e-6))
+
+        stations = db.execute(
+            base_query
+            .where(Station.lat.between(lat - dlat, lat + dlat))
+            .where(Station.lng.between(lng - dlng, lng + dlng))
+        ).all()
 
     count_in_radius = 0
     nearest_station = None
     nearest_distance = None
 
-    for s in stations:
-        d = haversine_m(lat, lng, s.lat, s.lng)
-
-        if nearest_distance is None or d < nearest_distance:
-            nearest_distance = d
-            nearest_station = s
-
-        if d <= radius:
-            count_in_radius += 1
+    def _nearest(rows):
+        lats = np.fromiter((s.lat for s in rows), dtype=np.float64, count=len(rows))
+        lngs = np.fromiter((s.lng for s in rows), dtype=np.float64, count=len(rows))
+        d = flat_earth_m(lat, lng, lats, lngs)
+        idx = int(np.argmin(d))
+        return rows[idx], float(d[idx]), int((d <= radius).sum())
+
+    if stations:
+        nearest_station, nearest_distance, count_in_radius = _nearest(stations)
+
+    # Nichts im Radius (Box leer oder nur Ecken-Treffer bis ~1,41*radius):
+    # die wirklich nächste Station kann knapp außerhalb der Box liegen
+    # -> stadtweit nachfassen (Semantik wie vor dem Vorfilter)
+    if count_in_radius == 0 and city_id is not None:
+        stations = db.execute(base_query).all()
+        if stations:
+            nearest_station, nearest_distance, count_in_radius = _nearest(stations)
 
     return {
         "lat": lat,
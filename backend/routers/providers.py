@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_read_db
 from models import Provider
 
 router = APIRouter(
@@ -8,14 +8,10 @@ router = APIRouter(
     tags=["providers"]
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/")
-def list_providers(db: Session = Depends(get_db)):
+def list_providers(response: Response, db: Session = Depends(get_read_db)):
+    # Provider ändern sich praktisch nie
+    response.headers["Cache-Control"] = "public, max-age=60"
+
     providers = db.query(Provider).all()
     return providers
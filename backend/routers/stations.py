@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from database import get_read_db
 from models import Station, StationLiveStatus, City
 
 router = APIRouter(
@@ -8,117 +9,86 @@ router = APIRouter(
     tags=["stations"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
+# Listen-Endpoints liefern nur Spalten: Core-select statt ORM-Instanzen,
+# spart Identity-Map und Attribut-Instrumentierung pro Zeile
+STATION_COLS = (
+    Station.id,
+    Station.name,
+    Station.lat,
+    Station.lng,
+    Station.capacity,
+    Station.bikes_available,
+    Station.docks_available,
+)
 
 
 @router.get("")
 def get_stations(
+    response: Response,
     city_id: int | None = None,
     city_name: str | None = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    query = db.query(Station)
+    # Live-Zahlen: kurz cachen reicht, entlastet die DB bei Karten-Polling
+    response.headers["Cache-Control"] = "public, max-age=5"
+
+    stmt = select(*STATION_COLS)
 
-  
     if city_id is not None:
-        query = query.filter(Station.city_id == city_id)
+        stmt = stmt.where(Station.city_id == city_id)
 
-    
     if city_name is not None:
-        query = (
-            query.join(City, City.id == Station.city_id)
-                 .filter(City.name.ilike(city_name))
+        stmt = (
+            stmt.join(City, City.id == Station.city_id)
+                .where(City.name.ilike(city_name))
         )
 
-    stations = query.all()
-
-    return [
-        {
-            "id": s.id,
-            "name": s.name,
-            "lat": s.lat,
-            "lng": s.lng,
-            "capacity": s.capacity,
-            "bikes_available": s.bikes_available,
-            "docks_available": s.docks_available,
-        }
-        for s in stations
-    ]
+    return [dict(r) for r in db.execute(stmt).mappings().all()]
 
 
 
 @router.get("/wiesbaden")
-def get_wiesbaden_stations(db: Session = Depends(get_db)):
-    
-    stations = (
-        db.query(Station)
-        .filter(Station.city_id == 470)
-        .all()
-    )
+def get_wiesbaden_stations(response: Response, db: Session = Depends(get_read_db)):
+    response.headers["Cache-Control"] = "public, max-age=5"
 
-    return [
-        {
-            "id": s.id,
-            "name": s.name,
-            "lat": s.lat,
-            "lng": s.lng,
-            "capacity": s.capacity,
-            "bikes_available": s.bikes_available,
-            "docks_available": s.docks_available,
-        }
-        for s in stations
-    ]
+    stmt = select(*STATION_COLS).where(Station.city_id == 470)
+
+    return [dict(r) for r in db.execute(stmt).mappings().all()]
 @router.get("/mainz")
-def get_mainz_stations(db: Session = Depends(get_db)):
-    stations = (
-        db.query(Station)
+def get_mainz_stations(response: Response, db: Session = Depends(get_read_db)):
+    response.headers["Cache-Control"] = "public, max-age=5"
+
+    stmt = (
+        select(Station.id, Station.name, Station.lat, Station.lng, Station.station_number)
         .join(City, City.id == Station.city_id)
-        .filter(City.name == "Mainz")
-        .all()
+        .where(City.name == "Mainz")
     )
 
-    return [
-        {
-            "id": s.id,
-            "name": s.name,
-            "lat": s.lat,
-            "lng": s.lng,
-            "station_number": s.station_number,
-        }
-        for s in stations
-    ]
+    return [dict(r) for r in db.execute(stmt).mappings().all()]
 
 
 @router.get("/{station_id}")
-def get_station(station_id: int, db: Session = Depends(get_db)):
-    station = db.query(Station).filter(Station.id == station_id).first()
+def get_station(station_id: int, response: Response, db: Session = Depends(get_read_db)):
+    response.headers["Cache-Control"] = "public, max-age=5"
 
-    if not station:
+    row = db.execute(
+        select(*STATION_COLS).where(Station.id == station_id)
+    ).mappings().first()
+
+    if not row:
         raise HTTPException(status_code=404, detail="Station not found")
 
-    return {
-        "id": station.id,
-        "name": station.name,
-        "lat": station.lat,
-        "lng": station.lng,
-        "capacity": station.capacity,
-        "bikes_available": station.bikes_available,
-        "docks_available": station.docks_available,
-    }
+    return dict(row)
 
 
 @router.get("/{station_id}/details")
-def get_station_details(station_id: int, db: Session = Depends(get_db)):
+def get_station_details(station_id: int, db: Session = Depends(get_read_db)):
     
+    # joinedload statt manuellem Join: der Join allein lädt die Relation nicht,
+    # station.city würde sonst einen zweiten SELECT auslösen
     station = (
         db.query(Station)
-        .join(City, City.id == Station.city_id, isouter=True)
+        .options(joinedload(Station.city))
         .filter(Station.id == station_id)
         .first()
     )
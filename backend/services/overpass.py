@@ -1,249 +1,432 @@
 # backend/services/overpass.py
+import asyncio
 import time
-import requests
 
-# Mehrere Overpass Endpoints 
+import httpx
+import orjson
+
+# Mehrere Overpass Endpoints
 OVERPASS_URLS = [
     "https://overpass-api.de/api/interpreter",
     "https://overpass.kumi.systems/api/interpreter",
     "https://overpass.openstreetmap.ru/api/interpreter",
 ]
 
-DEFAULT_TIMEOUT = 45  
-DEFAULT_RETRIES = 2  
+DEFAULT_TIMEOUT = 45
+DEFAULT_RETRIES = 2
 
 
 class OverpassError(Exception):
     pass
 
 
-def _post_overpass(query: str, timeout: int = DEFAULT_TIMEOUT):
+# Ein geteilter Async-Client: Keep-Alive statt neuem TLS-Handshake pro Abfrage;
+# gzip drückt Overpass-JSON auf ~1/10 der Transfergröße
+_client = httpx.AsyncClient(
+    http2=True,
+    timeout=DEFAULT_TIMEOUT,
+    limits=httpx.Limits(
+        max_connections=32,
+        max_keepalive_connections=16,
+        keepalive_expiry=60,
+    ),
+    headers={
+        "Accept-Encoding": "gzip",
+        "User-Agent": "Mikro1.0/overpass",
+    },
+)
+
+
+# Circuit Breaker pro Mirror: wer gerade durchfällt, wird für ein Backoff-
+# Fenster übersprungen, statt jeden Request (Retries x Timeout) zu kosten
+_endpoint_state = {url: {"fails": 0, "failed_until": 0.0} for url in OVERPASS_URLS}
+
+
+def _candidate_urls() -> list[str]:
+    now = time.monotonic()
+    healthy = [u for u in OVERPASS_URLS if _endpoint_state[u]["failed_until"] <= now]
+    if healthy:
+        return healthy
+    # alle getrippt: trotzdem versuchen, der am längsten gesperrte zuerst
+    return sorted(OVERPASS_URLS, key=lambda u: _endpoint_state[u]["failed_until"])
+
+
+async def _post_overpass(query: str, timeout: int = DEFAULT_TIMEOUT):
     """
     Try multiple Overpass servers with retries.
     Returns parsed JSON.
     """
     last_err = None
 
-    for base in OVERPASS_URLS:
+    for base in _candidate_urls():
+        state = _endpoint_state[base]
         for attempt in range(DEFAULT_RETRIES + 1):
             try:
-                r = requests.post(base, data={"data": query}, timeout=timeout)
+                r = await _client.post(base, data={"data": query}, timeout=timeout)
                 r.raise_for_status()
-                return r.json()
+                data = orjson.loads(r.content)  # orjson parst die großen Payloads in C
+                state["fails"] = 0
+                state["failed_until"] = 0.0
+                return data
             except Exception as e:
                 last_err = e
                 # backoff
-                time.sleep(1.0 + attempt * 1.5)
+                await asyncio.sleep(1.0 + attempt * 1.5)
+
+        # Retries für diesen Mirror erschöpft: exponentiell sperren (max 60s)
+        state["fails"] += 1
+        state["failed_until"] = time.monotonic() + min(60.0, 2.0 ** state["fails"])
 
     raise OverpassError(f"Overpass failed after retries. Last error: {last_err}")
 
 
-def _count_elements(query: str) -> int:
-    data = _post_overpass(query)
-   
-    return len(data.get("elements", []))
+async def _count_elements(query: str) -> int:
+    """
+    Erwartet eine Abfrage, die mit 'out count;' endet: Overpass liefert dann
+    nur eine Zählzeile statt aller Node-Payloads samt Tags und Koordinaten.
+    """
+    data = await _post_overpass(query)
+
+    for el in data.get("elements", []):
+        if el.get("type") == "count":
+            return int(el.get("tags", {}).get("total", 0))
+
+    raise OverpassError("Missing count section in Overpass response")
 
 
 def _around_clause(lat: float, lng: float, radius_m: int) -> str:
-   
+
     return f"(around:{radius_m},{lat},{lng})"
 
 
+# Reihenfolge der 'out count'-Sektionen in der kombinierten Abfrage
+_COMBINED_KEYS = [
+    "bus_stops",
+    "tram_stops",
+    "rail_stations",
+    "sbahn_stations",
+    "ubahn_stations",
+    "schools",
+    "universities",
+    "shops",
+    "hospitals",
+    "employers",
+    "parks",
+    "malls_supermarkets",
+    "tourism",
+]
 
 
-def count_bus_stops(lat: float, lng: float, radius_m: int) -> int:
-    around = _around_clause(lat, lng, radius_m)
-    query = f"""
+# Query-Templates einmal beim Import bauen: am Call-Site wird nur noch die
+# around-Klausel eingesetzt, statt den Text jedes Mal neu zusammenzubauen
+_COMBINED_TMPL = """
     [out:json][timeout:25];
     (
       node["highway"="bus_stop"]{around};
       node["public_transport"~"platform|stop_position"]["bus"="yes"]{around};
       node["amenity"="bus_station"]{around};
-    );
-    out;
+    )->.bus;
+    (
+      node["railway"="tram_stop"]{around};
+      node["public_transport"~"platform|stop_position"]["tram"="yes"]{around};
+    )->.tram;
+    (
+      node["railway"="station"]{around};
+      node["railway"="halt"]{around};
+    )->.rail;
+    (
+      node["railway"~"station|halt"]["network"~"S-Bahn",i]{around};
+      node["railway"~"station|halt"]["operator"~"S-Bahn",i]{around};
+      node["railway"~"station|halt"]["name"~"S-Bahn",i]{around};
+    )->.sbahn;
+    (
+      node["station"="subway"]{around};
+      node["railway"="subway_entrance"]{around};
+      node["subway"="yes"]{around};
+    )->.ubahn;
+    (
+      node["amenity"="school"]{around};
+      node["building"="school"]{around};
+    )->.schools;
+    (
+      node["amenity"="university"]{around};
+      node["amenity"="college"]{around};
+      node["building"="university"]{around};
+    )->.unis;
+    (
+      node["shop"]{around};
+    )->.shops;
+    (
+      node["amenity"="hospital"]{around};
+      node["amenity"="clinic"]{around};
+      node["amenity"="doctors"]{around};
+    )->.hospitals;
+    (
+      node["office"]{around};
+      node["industrial"]{around};
+      node["landuse"="industrial"]{around};
+      node["landuse"="commercial"]{around};
+    )->.employers;
+    (
+      node["leisure"="park"]{around};
+      node["leisure"="sports_centre"]{around};
+      node["leisure"="stadium"]{around};
+    )->.parks;
+    (
+      node["shop"="supermarket"]{around};
+      node["shop"="mall"]{around};
+      node["amenity"="marketplace"]{around};
+    )->.malls;
+    (
+      node["tourism"]{around};
+      node["historic"]{around};
+      node["amenity"="theatre"]{around};
+      node["amenity"="cinema"]{around};
+    )->.tourism;
+    .bus out count;
+    .tram out count;
+    .rail out count;
+    .sbahn out count;
+    .ubahn out count;
+    .schools out count;
+    .unis out count;
+    .shops out count;
+    .hospitals out count;
+    .employers out count;
+    .parks out count;
+    .malls out count;
+    .tourism out count;
+"""
+
+
+async def counts_combined(lat: float, lng: float, radius_m: int) -> dict:
     """
-    return _count_elements(query)
+    Alle Kontext-Zähler in einer einzigen Overpass-Abfrage:
+    benannte Sets + 'out count' pro Set, ein Round-Trip statt 13.
+    """
+    query = _COMBINED_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    data = await _post_overpass(query)
+
+    counts = [
+        int(el.get("tags", {}).get("total", 0))
+        for el in data.get("elements", [])
+        if el.get("type") == "count"
+    ]
+    if len(counts) != len(_COMBINED_KEYS):
+        raise OverpassError(
+            f"Unexpected combined count response ({len(counts)} sections)"
+        )
+
+    return dict(zip(_COMBINED_KEYS, counts))
+
+
 
 
-def count_tram_stops(lat: float, lng: float, radius_m: int) -> int:
-    around = _around_clause(lat, lng, radius_m)
-    query = f"""
+_BUS_STOPS_TMPL = """
+    [out:json][timeout:25];
+    (
+      node["highway"="bus_stop"]{around};
+      node["public_transport"~"platform|stop_position"]["bus"="yes"]{around};
+      node["amenity"="bus_station"]{around};
+    );
+    out count;
+"""
+
+
+async def count_bus_stops(lat: float, lng: float, radius_m: int) -> int:
+    query = _BUS_STOPS_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    return await _count_elements(query)
+
+
+_TRAM_STOPS_TMPL = """
     [out:json][timeout:25];
     (
       node["railway"="tram_stop"]{around};
       node["public_transport"~"platform|stop_position"]["tram"="yes"]{around};
     );
-    out;
-    """
-    return _count_elements(query)
+    out count;
+"""
 
 
-def count_rail_stations(lat: float, lng: float, radius_m: int) -> int:
-    """
-    "Rail" = railway=station oder railway=halt
-    """
-    around = _around_clause(lat, lng, radius_m)
-    query = f"""
+async def count_tram_stops(lat: float, lng: float, radius_m: int) -> int:
+    query = _TRAM_STOPS_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    return await _count_elements(query)
+
+
+_RAIL_STATIONS_TMPL = """
     [out:json][timeout:25];
     (
       node["railway"="station"]{around};
       node["railway"="halt"]{around};
     );
-    out;
-    """
-    return _count_elements(query)
+    out count;
+"""
 
 
-def count_sbahn_stations(lat: float, lng: float, radius_m: int) -> int:
+async def count_rail_stations(lat: float, lng: float, radius_m: int) -> int:
     """
-    S-Bahn ist in OSM nicht immer perfekt markiert.
-    Heuristik: railway=station/halt + network enthält 'S-Bahn' ODER operator/name enthält 'S-Bahn'
+    "Rail" = railway=station oder railway=halt
     """
-    around = _around_clause(lat, lng, radius_m)
-    query = f"""
+    query = _RAIL_STATIONS_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    return await _count_elements(query)
+
+
+_SBAHN_TMPL = """
     [out:json][timeout:25];
     (
       node["railway"~"station|halt"]["network"~"S-Bahn",i]{around};
       node["railway"~"station|halt"]["operator"~"S-Bahn",i]{around};
       node["railway"~"station|halt"]["name"~"S-Bahn",i]{around};
     );
-    out;
-    """
-    return _count_elements(query)
+    out count;
+"""
 
 
-def count_ubahn_stations(lat: float, lng: float, radius_m: int) -> int:
+async def count_sbahn_stations(lat: float, lng: float, radius_m: int) -> int:
     """
-    U-Bahn/Subway: station=subway oder railway=subway_entrance oder subway=yes
+    S-Bahn ist in OSM nicht immer perfekt markiert.
+    Heuristik: railway=station/halt + network enthält 'S-Bahn' ODER operator/name enthält 'S-Bahn'
     """
-    around = _around_clause(lat, lng, radius_m)
-    query = f"""
+    query = _SBAHN_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    return await _count_elements(query)
+
+
+_UBAHN_TMPL = """
     [out:json][timeout:25];
     (
       node["station"="subway"]{around};
       node["railway"="subway_entrance"]{around};
       node["subway"="yes"]{around};
     );
-    out;
-    """
-    return _count_elements(query)
+    out count;
+"""
+
 
+async def count_ubahn_stations(lat: float, lng: float, radius_m: int) -> int:
+    """
+    U-Bahn/Subway: station=subway oder railway=subway_entrance oder subway=yes
+    """
+    query = _UBAHN_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    return await _count_elements(query)
 
 
 
-def count_schools_universities(lat: float, lng: float, radius_m: int) -> dict:
-    around = _around_clause(lat, lng, radius_m)
 
-    q_schools = f"""
+_SCHOOLS_UNIS_TMPL = """
     [out:json][timeout:25];
     (
       node["amenity"="school"]{around};
       node["building"="school"]{around};
-    );
-    out;
-    """
-    q_unis = f"""
-    [out:json][timeout:25];
+    )->.schools;
     (
       node["amenity"="university"]{around};
       node["amenity"="college"]{around};
       node["building"="university"]{around};
-    );
-    out;
-    """
-    return {
-        "schools": _count_elements(q_schools),
-        "universities": _count_elements(q_unis),
-    }
+    )->.unis;
+    .schools out count;
+    .unis out count;
+"""
+
+
+async def count_schools_universities(lat: float, lng: float, radius_m: int) -> dict:
+    # beide Kategorien als benannte Sets in einer Abfrage (ein Round-Trip)
+    query = _SCHOOLS_UNIS_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    data = await _post_overpass(query)
+
+    counts = [
+        int(el.get("tags", {}).get("total", 0))
+        for el in data.get("elements", [])
+        if el.get("type") == "count"
+    ]
+    if len(counts) != 2:
+        raise OverpassError(
+            f"Unexpected schools/unis count response ({len(counts)} sections)"
+        )
+
+    return {"schools": counts[0], "universities": counts[1]}
 
 
-def count_shops(lat: float, lng: float, radius_m: int) -> int:
-    around = _around_clause(lat, lng, radius_m)
-    query = f"""
+_SHOPS_TMPL = """
     [out:json][timeout:25];
     (
       node["shop"]{around};
     );
-    out;
-    """
-    return _count_elements(query)
+    out count;
+"""
+
+
+async def count_shops(lat: float, lng: float, radius_m: int) -> int:
+    query = _SHOPS_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    return await _count_elements(query)
 
 
-def count_pois(lat: float, lng: float, radius_m: int) -> dict:
+# Reihenfolge der 'out count'-Sektionen in der POI-Abfrage
+_POI_KEYS = ["hospitals", "employers", "parks", "malls_supermarkets", "tourism"]
+
+
+_POIS_TMPL = """
+    [out:json][timeout:25];
+    (
+      node["amenity"="hospital"]{around};
+      node["amenity"="clinic"]{around};
+      node["amenity"="doctors"]{around};
+    )->.hospitals;
+    (
+      node["office"]{around};
+      node["industrial"]{around};
+      node["landuse"="industrial"]{around};
+      node["landuse"="commercial"]{around};
+    )->.employers;
+    (
+      node["leisure"="park"]{around};
+      node["leisure"="sports_centre"]{around};
+      node["leisure"="stadium"]{around};
+    )->.parks;
+    (
+      node["shop"="supermarket"]{around};
+      node["shop"="mall"]{around};
+      node["amenity"="marketplace"]{around};
+    )->.malls;
+    (
+      node["tourism"]{around};
+      node["historic"]{around};
+      node["amenity"="theatre"]{around};
+      node["amenity"="cinema"]{around};
+    )->.tourism;
+    .hospitals out count;
+    .employers out count;
+    .parks out count;
+    .malls out count;
+    .tourism out count;
+"""
+
+
+async def count_pois(lat: float, lng: float, radius_m: int) -> dict:
     """
     POIs: frei erweiterbar.
     Wir geben breakdown + total.
+
+    Alle fünf Kategorien als benannte Sets in einer Abfrage statt
+    fünf Round-Trips (gleiches Muster wie counts_combined).
     """
-    around = _around_clause(lat, lng, radius_m)
-
-    queries = {
-        # Gesundheit
-        "hospitals": f"""
-        [out:json][timeout:25];
-        (
-          node["amenity"="hospital"]{around};
-          node["amenity"="clinic"]{around};
-          node["amenity"="doctors"]{around};
-        );
-        out;
-        """,
-        # Arbeit 
-        "employers": f"""
-        [out:json][timeout:25];
-        (
-          node["office"]{around};
-          node["industrial"]{around};
-          node["landuse"="industrial"]{around};
-          node["landuse"="commercial"]{around};
-        );
-        out;
-        """,
-        # Freizeit
-        "parks": f"""
-        [out:json][timeout:25];
-        (
-          node["leisure"="park"]{around};
-          node["leisure"="sports_centre"]{around};
-          node["leisure"="stadium"]{around};
-        );
-        out;
-        """,
-        # Einkaufen/Ankerpunkte
-        "malls_supermarkets": f"""
-        [out:json][timeout:25];
-        (
-          node["shop"="supermarket"]{around};
-          node["shop"="mall"]{around};
-          node["amenity"="marketplace"]{around};
-        );
-        out;
-        """,
-        # Tourism/Hotspots
-        "tourism": f"""
-        [out:json][timeout:25];
-        (
-          node["tourism"]{around};
-          node["historic"]{around};
-          node["amenity"="theatre"]{around};
-          node["amenity"="cinema"]{around};
-        );
-        out;
-        """,
-    }
-
-    breakdown = {}
-    total = 0
-    for key, q in queries.items():
-        c = _count_elements(q)
-        breakdown[key] = c
-        total += c
-
-    return {"total": total, "breakdown": breakdown}
-
-
-def fetch_poi_elements(lat: float, lng: float, radius_m: int, limit: int = 200) -> list[dict]:
-    around = _around_clause(lat, lng, radius_m)
-    query = f"""
+    query = _POIS_TMPL.format(around=_around_clause(lat, lng, radius_m))
+    data = await _post_overpass(query)
+
+    counts = [
+        int(el.get("tags", {}).get("total", 0))
+        for el in data.get("elements", [])
+        if el.get("type") == "count"
+    ]
+    if len(counts) != len(_POI_KEYS):
+        raise OverpassError(
+            f"Unexpected POI count response ({len(counts)} sections)"
+        )
+
+    breakdown = dict(zip(_POI_KEYS, counts))
+    return {"total": sum(counts), "breakdown": breakdown}
+
+
+_POI_ELEMENTS_TMPL = """
     [out:json][timeout:25];
     (
       node["shop"]{around};
@@ -252,8 +435,14 @@ def fetch_poi_elements(lat: float, lng: float, radius_m: int, limit: int = 200)
       node["amenity"="college"]{around};
     );
     out {limit};
-    """
-    data = _post_overpass(query)
+"""
+
+
+async def fetch_poi_elements(lat: float, lng: float, radius_m: int, limit: int = 200) -> list[dict]:
+    query = _POI_ELEMENTS_TMPL.format(
+        around=_around_clause(lat, lng, radius_m), limit=limit
+    )
+    data = await _post_overpass(query)
     elements = data.get("elements", [])
 
     results: list[dict] = []